@@ -1,4 +1,5 @@
 import argparse
+import multiprocessing
 
 import pytmdl.utils as utils
 from pytmdl.ytsong import YTSong, SongUnavailable
@@ -113,6 +114,8 @@ class PYTMDL:
                     print(self.lang_dict["wrong_url"])
 
 if __name__ == "__main__":
+    # Needed by the cover process pool in PyInstaller executables
+    multiprocessing.freeze_support()
     pytmdl = PYTMDL()
     arguments = pytmdl.parse_arguments()
     pytmdl.validate_arguments(arguments)
\ No newline at end of file
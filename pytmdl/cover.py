@@ -0,0 +1,225 @@
+import io
+import re
+import hashlib
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+
+# Image formats recognised by their leading magic bytes
+FORMAT_JPEG = "jpeg"
+FORMAT_PNG = "png"
+FORMAT_WEBP = "webp"
+FORMAT_GIF = "gif"
+FORMAT_UNKNOWN = "unknown"
+
+# Googleusercontent size suffix, e.g. `=w544-h544-l90-rj`
+size_suffix = re.compile(r"=w(\d+)-h(\d+)([^/]*)$")
+
+def detect_format(data):
+    """
+    Detects the real format of an image from its leading bytes.
+
+    The `og:image` URL does not say what it serves, and the CDN may answer
+    with PNG or WebP even when the URL looks like a JPEG.
+
+    Args:
+        data (bytes): The raw image data.
+
+    Returns:
+        str: One of the `FORMAT_*` constants.
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return FORMAT_JPEG
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return FORMAT_PNG
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return FORMAT_WEBP
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return FORMAT_GIF
+    return FORMAT_UNKNOWN
+
+def request_size(url, size):
+    """
+    Rewrites a cover URL so the CDN serves the image no larger than the given resolution.
+
+    The requested size is only ever lowered, a cover served at 544x544 is not enlarged.
+    Only googleusercontent URLs carry a size suffix; any other URL is returned unchanged
+    and the image is resized locally instead.
+
+    Args:
+        url (str): The cover URL.
+        size (int): The maximum width and height in pixels.
+
+    Returns:
+        str: The rewritten URL.
+    """
+    return size_suffix.sub(
+        lambda m: f"=w{min(int(m.group(1)), size)}-h{min(int(m.group(2)), size)}{m.group(3)}",
+        url
+        )
+
+def normalize_cover(data, max_size, max_bytes):
+    """
+    Re-encodes an image as a JPEG no larger than `max_size` pixels per side and,
+    where possible, no larger than `max_bytes` bytes.
+
+    The quality is lowered step by step until the result fits. If even the lowest quality
+    does not fit, the smallest encoding is returned. This function is CPU-bound and is meant
+    to run inside a worker process.
+
+    Args:
+        data (bytes): The raw image data, in any format Pillow can read.
+        max_size (int): The maximum width and height in pixels.
+        max_bytes (int): The maximum size of the encoded JPEG in bytes.
+
+    Returns:
+        bytes: The encoded JPEG.
+
+    Raises:
+        PIL.UnidentifiedImageError: If the data is not a readable image.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        # JPEG has no alpha channel, flatten transparent covers onto white
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        for quality in (90, 85, 80, 70, 60, 50):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                break
+
+    return buffer.getvalue()
+
+class CoverProcessor:
+    def __init__(
+            self,
+            max_size=1000,
+            max_bytes=300_000,
+            max_workers=None
+            ):
+        """
+        Constructs a `CoverProcessor` object.
+
+        Covers are normalized in a process pool so the work does not hold up downloads.
+        Results are memoized by the SHA-256 of the source image, so the same cover shared
+        by every track of an album is only processed once.
+
+        Args:
+            max_size (int, optional): The maximum width and height of a cover in pixels. Defaults to `1000`.
+            max_bytes (int, optional): The maximum size of an encoded cover in bytes. Defaults to `300000`.
+            max_workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.__executor = None
+        self.__cache = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def submit(self, data):
+        """
+        Schedules a cover for normalization.
+
+        Failed results are not memoized, and a pool broken by a dead worker is replaced.
+
+        Args:
+            data (bytes): The raw image data.
+
+        Returns:
+            concurrent.futures.Future: A future resolving to the JPEG-encoded cover.
+        """
+        key = hashlib.sha256(data).hexdigest()
+        if key in self.__cache:
+            return self.__cache[key]
+
+        # JPEGs that already fit are embedded as they are
+        if detect_format(data) == FORMAT_JPEG and len(data) <= self.max_bytes and self.__fits(data):
+            future = Future()
+            future.set_result(data)
+        else:
+            try:
+                future = self.__submit(data)
+            except BrokenProcessPool:
+                self.__executor.shutdown(wait=False)
+                self.__executor = None
+                future = self.__submit(data)
+
+        self.__cache[key] = future
+        future.add_done_callback(lambda f: self.__forget_failure(key, f))
+        return future
+
+    def __submit(self, data):
+        """
+        Submits a cover to the process pool, starting the pool if needed.
+
+        Args:
+            data (bytes): The raw image data.
+
+        Returns:
+            concurrent.futures.Future: A future resolving to the JPEG-encoded cover.
+        """
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.__executor.submit(normalize_cover, data, self.max_size, self.max_bytes)
+
+    def __forget_failure(self, key, future):
+        """
+        Removes a failed result from the cache so the cover is processed again next time.
+
+        Args:
+            key (str): The cache key of the cover.
+            future (concurrent.futures.Future): The finished future.
+        """
+        if future.exception() is not None and self.__cache.get(key) is future:
+            del self.__cache[key]
+
+    def process(self, data):
+        """
+        Normalizes a cover and waits for the result.
+
+        Args:
+            data (bytes): The raw image data.
+
+        Returns:
+            bytes: The JPEG-encoded cover.
+        """
+        return self.submit(data).result()
+
+    def shutdown(self):
+        """
+        Shuts down the worker processes, if any were started.
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __fits(self, data):
+        """
+        Checks if an image is within `max_size` and in a color mode players render reliably,
+        without decoding the pixel data.
+
+        Args:
+            data (bytes): The raw image data.
+
+        Returns:
+            bool: `True` if neither side is larger than `max_size` and the image is RGB or grayscale.
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return max(image.size) <= self.max_size and image.mode in ("RGB", "L")
+        except OSError:
+            return False
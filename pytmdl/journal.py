@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import random
+import logging
+import requests
+import http.client
+import urllib.error
+
+from PIL import UnidentifiedImageError
+from pytubefix.exceptions import VideoUnavailable
+from pytmdl.ytsong import SongUnavailable, CoverNotFound, NoMetadata
+
+logger = logging.getLogger(__name__)
+
+journal_filename = ".pytmdl_journal.jsonl"
+
+# Stages of a track, in the order they run
+STAGE_DOWNLOAD = "download"
+STAGE_COVER = "cover"
+STAGE_METADATA = "metadata"
+
+# Record statuses
+STATUS_STARTED = "started"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_RESET = "reset"
+
+def is_permanent(error):
+    """
+    Checks if an error will fail the same way every time it is tried again.
+
+    Permanent errors are unavailable videos, missing metadata and missing or unreadable covers.
+    The stage that failed with one is skipped by later runs.
+
+    Args:
+        error (Exception): The error to classify.
+
+    Returns:
+        bool: `True` if the error is permanent.
+    """
+    return isinstance(error, (
+        SongUnavailable,
+        VideoUnavailable,
+        NoMetadata,
+        CoverNotFound,
+        UnidentifiedImageError
+    ))
+
+def is_transient(error):
+    """
+    Checks if an error may succeed if tried again shortly.
+
+    Transient errors are network failures: dropped connections, timeouts, rate limiting and server errors.
+    They are retried with backoff. Errors that are neither transient nor permanent (a full disk,
+    a bug) are not retried and fail the stage for the current run only.
+
+    Args:
+        error (Exception): The error to classify.
+
+    Returns:
+        bool: `True` if the error is transient.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and is_transient_status(error.response.status_code)
+    if isinstance(error, urllib.error.HTTPError):
+        return is_transient_status(error.code)
+
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        urllib.error.URLError,
+        http.client.IncompleteRead,
+        ConnectionError,
+        TimeoutError
+    ))
+
+def is_transient_status(status_code):
+    """
+    Checks if an HTTP status code is worth retrying.
+
+    Args:
+        status_code (int): The HTTP status code.
+
+    Returns:
+        bool: `True` for rate limiting (429) and server errors (5xx).
+    """
+    return status_code == 429 or status_code >= 500
+
+def retry(function, attempts=4, base_delay=2.0):
+    """
+    Calls a function, retrying it with exponential backoff while it raises transient errors.
+
+    Args:
+        function (callable): The function to call, without arguments.
+        attempts (int, optional): The maximum number of calls. Defaults to `4`.
+        base_delay (float, optional): The delay before the first retry in seconds.
+            It doubles after each attempt and is randomized by up to 50%. Defaults to `2.0`.
+
+    Returns:
+        The return value of `function`.
+
+    Raises:
+        Exception: The last error, if it is permanent or all attempts failed.
+    """
+    for attempt in range(attempts):
+        try:
+            return function()
+        except Exception as e:
+            if not is_transient(e) or attempt == attempts - 1:
+                raise
+
+            delay = base_delay * 2 ** attempt * random.uniform(1, 1.5)
+            logger.warning(f"Transient error, retrying in {delay:.1f}s ({attempt + 1}/{attempts - 1}): {e}")
+            time.sleep(delay)
+
+class RunJournal:
+    def __init__(
+            self,
+            directory,
+            sync_every=16,
+            sync_interval=5.0
+            ):
+        """
+        Constructs a `RunJournal` object.
+
+        The journal is an append-only file of JSON records, one per line, stored in `directory`.
+        Each record marks a stage of a track as started, done or failed. Replaying it on the next run
+        tells which stages can be skipped. Every record is flushed to the operating system as soon as it
+        is written, which survives the program being killed. To keep the overhead small, the file is only
+        synced to disk every `sync_every` records or `sync_interval` seconds, and when the journal is closed.
+
+        Args:
+            directory (str): The directory where the journal is stored. Created if it does not exist.
+            sync_every (int, optional): The number of records written between disk syncs. Defaults to `16`.
+            sync_interval (float, optional): The maximum time between disk syncs in seconds. Defaults to `5.0`.
+        """
+        self.path = os.path.join(directory, journal_filename)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.__tracks = {}
+        self.__pending = 0
+        self.__last_sync = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        self.__replay()
+        self.__file = open(self.path, "a", encoding="utf-8")
+
+        # A crash can leave the last record without its line ending
+        if self.__file.tell() > 0 and not self.__ends_with_newline():
+            self.__file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __replay(self):
+        """
+        Rebuilds the state of every track from the records of previous runs.
+
+        Records that cannot be parsed (a line cut short by a crash) are ignored.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.__apply(record)
+        except FileNotFoundError:
+            pass
+
+    def __apply(self, record):
+        """
+        Updates the state of a track with a record.
+
+        Args:
+            record (dict): The journal record.
+        """
+        if record["status"] == STATUS_RESET:
+            self.__tracks.pop(record["track"], None)
+            return
+
+        state = self.__tracks.setdefault(record["track"], {"started": set(), "done": {}, "failed": {}})
+
+        if record["status"] == STATUS_STARTED:
+            state["started"].add(record["stage"])
+        elif record["status"] == STATUS_DONE:
+            state["done"][record["stage"]] = record
+            state["failed"].pop(record["stage"], None)
+        elif record["status"] == STATUS_FAILED:
+            state["failed"][record["stage"]] = record
+
+    def __ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __write(self, record):
+        """
+        Appends a record, flushes it and syncs the file to disk if a batch is complete.
+
+        Args:
+            record (dict): The journal record.
+        """
+        self.__apply(record)
+        self.__file.write(json.dumps(record) + "\n")
+        self.__file.flush()
+        self.__pending += 1
+
+        if self.__pending >= self.sync_every or time.monotonic() - self.__last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        Syncs every record written so far to disk.
+        """
+        os.fsync(self.__file.fileno())
+        self.__pending = 0
+        self.__last_sync = time.monotonic()
+
+    def close(self):
+        """
+        Syncs the journal to disk and closes it.
+        """
+        if not self.__file.closed:
+            self.sync()
+            self.__file.close()
+
+    def start(self, track, stage):
+        """
+        Records that a stage of a track has started.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+        """
+        self.__write({"track": track, "stage": stage, "status": STATUS_STARTED})
+
+    def complete(self, track, stage, **details):
+        """
+        Records that a stage of a track has completed.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+            **details: Values needed by later runs (e.g. the path of the audio file), stored in the record.
+        """
+        self.__write({"track": track, "stage": stage, "status": STATUS_DONE, **details})
+
+    def fail(self, track, stage, error):
+        """
+        Records that a stage of a track has failed.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+            error (Exception): The error that made the stage fail.
+        """
+        self.__write({
+            "track": track,
+            "stage": stage,
+            "status": STATUS_FAILED,
+            "permanent": is_permanent(error),
+            "error": f"{type(error).__name__}: {error}"
+        })
+
+    def is_done(self, track, stage):
+        """
+        Checks if a stage of a track has completed.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+
+        Returns:
+            bool: `True` if the stage has completed.
+        """
+        return track in self.__tracks and stage in self.__tracks[track]["done"]
+
+    def completed(self, track, stage):
+        """
+        Returns the record of the completion of a stage of a track, if any.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+
+        Returns:
+            dict: The completion record, or `None` if the stage has not completed.
+        """
+        if track not in self.__tracks:
+            return None
+        return self.__tracks[track]["done"].get(stage)
+
+    def is_interrupted(self, track, stage):
+        """
+        Checks if a stage of a track was started but never completed.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+
+        Returns:
+            bool: `True` if the stage was interrupted.
+        """
+        return (
+            track in self.__tracks
+            and stage in self.__tracks[track]["started"]
+            and stage not in self.__tracks[track]["done"]
+        )
+
+    def permanent_failure(self, track, stage):
+        """
+        Returns the record of the permanent failure of a stage of a track, if any.
+
+        Stages that failed permanently are skipped by later runs.
+        Deleting the journal file makes them be tried again.
+
+        Args:
+            track (str): The track URL.
+            stage (str): One of the `STAGE_*` constants.
+
+        Returns:
+            dict: The failure record, or `None` if the stage did not fail permanently.
+        """
+        if track not in self.__tracks:
+            return None
+
+        failed = self.__tracks[track]["failed"].get(stage)
+        if failed != None and failed["permanent"]:
+            return failed
+        return None
+
+    def forget(self, track):
+        """
+        Records that a track has to start over from the first stage.
+
+        Args:
+            track (str): The track URL.
+        """
+        self.__write({"track": track, "stage": None, "status": STATUS_RESET})
@@ -1,4 +1,11 @@
-from pytmdl.ytsong import YTSong
+import os.path
+import logging
+import pytmdl.utils as utils
+import pytmdl.journal as journal
+
+from pytmdl.ytsong import YTSong, NoMetadata
+from pytmdl.cover import CoverProcessor
+from pytmdl.journal import RunJournal, retry
 from pytubefix import Playlist
 
 class YTAlbum:
@@ -33,7 +40,11 @@ class YTAlbum:
         self.skip_metadata = skip_metadata
         self.search_max_display = search_max_display
         self.country = country
-        self.lang_dict = lang_dict
+        self.logger = logging.getLogger(__name__)
+        if lang_dict == None:
+            self.lang_dict = utils.load_language(language)
+        else:
+            self.lang_dict = lang_dict
 
         try:
             print(f"Items in album: {self.pl.length}")
@@ -57,8 +68,11 @@ class YTAlbum:
             ytsong = YTSong(
                 music_url,
                 self.output_dir + "/" + self.pl.title,
-                self.skip_metadata,
-                self.search_max_display
+                skip_metadata=self.skip_metadata,
+                search_max_display=self.search_max_display,
+                language=self.language,
+                country=self.country,
+                lang_dict=self.lang_dict
                 )
             ytsong.download_only()
 
@@ -68,13 +82,18 @@ class YTAlbum:
             auto_select_mode=False
             ):
         """
-        Loops through the songs/videos in the playlist and calls `YTSong.download()`
-        on each one.
+        Loops through the songs/videos in the playlist and downloads each one with its cover and metadata.
+
+        Like `YTSong.download()`, each song is downloaded, its cover is embedded into the audio file
+        and the downloaded image is deleted by default. Then, it allows the user to select metadata sources
+        to download and embeds the selected metadata into the audio file. Covers are normalized by a process pool
+        shared by all songs, so a cover used by the whole album is only processed once.
 
-        `YTSong.download()` downloads a song and its cover, embeds the image into the audio file, 
-        and deletes the downloaded image by default.
-        Then, it allows the user to select metadata sources to download and embeds the selected metadata 
-        into the audio file.
+        Every completed stage is recorded in a `RunJournal` in the album directory. If a run is interrupted,
+        the next one resumes each song at its first incomplete stage. Transient network errors are retried
+        with backoff. Stages failing with a permanent error (unavailable video, no metadata, missing cover)
+        are recorded and not tried again by later runs. The cover and metadata stages do not depend on each other,
+        a failure in one does not stop the other.
 
         Args:
             delete_image (bool, optional): When set to `False`, it will keep the image file.
@@ -83,25 +102,198 @@ class YTAlbum:
             to be automatically selected therefore bypassing the user selection screen.
             Defaults to `False`.
         """
-        for url in self.pl.video_urls:
-            # Replace URL to the music version to get the square cover image
-            music_url = url.replace("www", "music")
+        album_dir = os.path.expanduser(self.output_dir + "/" + self.pl.title)
 
-            ytsong = YTSong(
-                music_url,
-                self.language,
+        # Each song waits for its cover before the next one starts, one worker is enough
+        with CoverProcessor(max_workers=1) as cover_processor, RunJournal(album_dir) as run_journal:
+            for url in self.pl.video_urls:
+                # Replace URL to the music version to get the square cover image
+                music_url = url.replace("www", "music")
+
+                # Without the audio file there is nothing else to do
+                failure = run_journal.permanent_failure(music_url, journal.STAGE_DOWNLOAD)
+                if failure != None:
+                    print(self.lang_dict["track_skipped"] % (music_url, failure["error"]))
+                    continue
+
+                if self.__is_finished(run_journal, music_url):
+                    continue
+
+                try:
+                    self.__download_track(
+                        music_url,
+                        run_journal,
+                        cover_processor,
+                        delete_image,
+                        auto_select_mode
+                        )
+                except Exception as e:
+                    self.__report_failure(music_url, e)
+
+    def __report_failure(self, url, error):
+        """
+        Logs and prints an error that stopped a stage of a song.
+
+        Args:
+            url (str): The URL of the song.
+            error (Exception): The error of the failed stage.
+        """
+        self.logger.error(f"Could not finish {url}: {error}")
+        print(self.lang_dict["track_failed"] % (url, error))
+
+    def __pending_stages(self, run_journal, url):
+        """
+        Returns the stages of a song that are neither done nor failed permanently.
+
+        Args:
+            run_journal (RunJournal): The journal of the current run.
+            url (str): The URL of the song.
+
+        Returns:
+            list: The pending `journal.STAGE_*` constants, in the order they run.
+        """
+        stages = [journal.STAGE_DOWNLOAD, journal.STAGE_COVER]
+        if not self.skip_metadata:
+            stages.append(journal.STAGE_METADATA)
+
+        return [
+            stage for stage in stages
+            if not run_journal.is_done(url, stage) and run_journal.permanent_failure(url, stage) == None
+        ]
+
+    def __is_finished(self, run_journal, url):
+        """
+        Checks if nothing is left to do for a song and its audio file still exists.
+
+        This lets finished songs be skipped without fetching them from YouTube or searching their metadata again.
+
+        Args:
+            run_journal (RunJournal): The journal of the current run.
+            url (str): The URL of the song.
+
+        Returns:
+            bool: `True` if every stage is done or failed permanently.
+        """
+        if self.__pending_stages(run_journal, url):
+            return False
+
+        path = run_journal.completed(url, journal.STAGE_DOWNLOAD).get("path")
+        return path != None and os.path.isfile(path)
+
+    def __download_track(
+            self,
+            url,
+            run_journal,
+            cover_processor,
+            delete_image,
+            auto_select_mode
+            ):
+        """
+        Runs the stages of a song that are not recorded as done in the journal.
+
+        A failed cover or metadata stage is recorded and reported, and the remaining stages still run.
+
+        Args:
+            url (str): The URL of the song.
+            run_journal (RunJournal): The journal of the current run.
+            cover_processor (CoverProcessor): The processor shared by all songs.
+            delete_image (bool): When set to `False`, it will keep the image file.
+            auto_select_mode (bool): When set to `True`, the metadata source is selected automatically.
+
+        Raises:
+            Exception: The error of the download stage, after it was recorded in the journal.
+        """
+        try:
+            ytsong = retry(lambda: YTSong(
+                url,
                 self.output_dir + "/" + self.pl.title,
-                self.skip_metadata,
-                self.search_max_display,
-                self.country,
-                self.lang_dict
-                )
-            
-            ytsong.download(
-                image_path=ytsong.full_track_name + ".jpg",
-                delete_image=delete_image,
-                auto_select_mode=auto_select_mode
-                )
+                skip_metadata=self.skip_metadata,
+                search_max_display=self.search_max_display,
+                language=self.language,
+                country=self.country,
+                lang_dict=self.lang_dict,
+                cover_processor=cover_processor
+                ))
+        except Exception as e:
+            # The song is needed by every stage, blame the first one it kept from running.
+            # If every stage is finished, the audio file is missing and has to be downloaded again.
+            pending = self.__pending_stages(run_journal, url) or [journal.STAGE_DOWNLOAD]
+            run_journal.fail(url, pending[0], e)
+            raise
+
+        # The audio file is the base of every other stage, start over if it is gone.
+        # If the download itself was interrupted, the file left behind is incomplete.
+        if os.path.isfile(ytsong.full_path):
+            if run_journal.is_interrupted(url, journal.STAGE_DOWNLOAD):
+                os.remove(ytsong.full_path)
+        elif run_journal.is_done(url, journal.STAGE_DOWNLOAD):
+            run_journal.forget(url)
+
+        # Start processing the cover while the audio downloads.
+        # Errors are kept in the future and raised by the cover stage.
+        cover = None
+        if not run_journal.is_done(url, journal.STAGE_COVER):
+            cover = ytsong.request_cover()
+
+        self.__run_stage(
+            run_journal,
+            url,
+            journal.STAGE_DOWNLOAD,
+            ytsong.download_only,
+            path=ytsong.full_path
+            )
+
+        def embed_cover():
+            # Only the first attempt uses the prefetched cover, retries request it again
+            nonlocal cover
+            prefetched, cover = cover, None
+            ytsong.embed_cover(ytsong.full_path, ytsong.full_track_name + ".jpg", delete_image, prefetched)
+
+        def embed_metadata():
+            # Searching was enabled but returned no results
+            if ytsong.skip_metadata:
+                raise NoMetadata(f"No metadata was found for {ytsong.full_track_name}")
+            ytsong.embed_metadata(auto_select_mode)
+
+        stages = [(journal.STAGE_COVER, embed_cover)]
+        if not self.skip_metadata:
+            stages.append((journal.STAGE_METADATA, embed_metadata))
+
+        for stage, function in stages:
+            try:
+                self.__run_stage(run_journal, url, stage, function)
+            except Exception as e:
+                self.__report_failure(url, e)
+
+    def __run_stage(self, run_journal, url, stage, function, **details):
+        """
+        Runs a stage of a song with retries, unless the journal records it as done or failed permanently.
+
+        Args:
+            run_journal (RunJournal): The journal of the current run.
+            url (str): The URL of the song.
+            stage (str): One of the `journal.STAGE_*` constants.
+            function (callable): The function running the stage, without arguments.
+            **details: Values stored in the record marking the stage as done.
+
+        Returns:
+            The return value of `function`, or `None` if the stage was skipped.
+
+        Raises:
+            Exception: The error of the stage, after it was recorded in the journal.
+        """
+        if run_journal.is_done(url, stage) or run_journal.permanent_failure(url, stage) != None:
+            return None
+
+        run_journal.start(url, stage)
+        try:
+            result = retry(function)
+        except Exception as e:
+            run_journal.fail(url, stage, e)
+            raise
+
+        run_journal.complete(url, stage, **details)
+        return result
 
 class NotAnAlbum(Exception):
     def __init__(self, message):
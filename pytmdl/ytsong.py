@@ -4,7 +4,9 @@ import logging
 import itunespy
 import pytmdl.utils as utils
 
+from pytmdl.cover import CoverProcessor, request_size
 from datetime import datetime
+from concurrent.futures import Future
 from bs4 import BeautifulSoup
 from pytubefix import YouTube
 from pytubefix.cli import on_progress
@@ -23,7 +25,8 @@ class YTSong:
             search_max_display=15,
             language="EN",
             country="US",
-            lang_dict=None
+            lang_dict=None,
+            cover_processor=None
             ):
         """
         Constructs a `YTSong` object.
@@ -43,6 +46,9 @@ class YTSong:
                 Defaults to "US" (United States).
             lang_dict (dict, optional): A dictionary mapping languages to their codes. 
                 If not provided, the dictionary matching the default language will be used.
+            cover_processor (CoverProcessor, optional): The processor used to normalize the cover.
+                Pass a shared processor when downloading several songs so covers are only processed once.
+                If not provided, the song creates and shuts down its own.
 
         Raises:
             SongUnavailable: If the song/video cannot be found at the given URL
@@ -52,6 +58,11 @@ class YTSong:
         self.output_dir = os.path.expanduser(output_dir) # Needs $HOME to be set
         self.skip_metadata = skip_metadata
         self.search_max_display = search_max_display
+        self.owns_cover_processor = cover_processor == None
+        if cover_processor == None:
+            self.cover_processor = CoverProcessor(max_workers=1)
+        else:
+            self.cover_processor = cover_processor
 
         # Initialize core features
         self.__init_logger(utils.log_dir)
@@ -251,45 +262,69 @@ class YTSong:
             youtube_url (str): The YouTube video/song URL.
 
         Returns:
-            str: The cover URL if found; otherwise, an error message indicating that the URL was not found or retrieval failed.
+            str: The cover URL.
 
         Raises:
-            requests.exceptions.RequestException: If there is a network-related error when making the request.
+            requests.exceptions.RequestException: If there is a network-related error when making the request,
+                or if the page is returned with an error status code.
+            CoverNotFound: If the page does not contain a cover URL.
         """
         response = requests.get(youtube_url)
+        response.raise_for_status()
 
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            meta_tag = soup.find('meta', attrs={'property': 'og:image'})
-            
-            if meta_tag:
-                return meta_tag['content']
-            else:
-                return "Cover URL not found."
-        else:
-            return "Failed to retrieve page."
+        soup = BeautifulSoup(response.content, 'html.parser')
+        meta_tag = soup.find('meta', attrs={'property': 'og:image'})
+
+        if not meta_tag:
+            raise CoverNotFound(f"Cover URL not found at {youtube_url}")
+        return meta_tag['content']
     
-    def embed_cover(self, audio_path, image_path, delete_image):
+    def request_cover(self):
+        """
+        Downloads the cover and schedules it for normalization in the cover processor.
+
+        The cover is requested at the processor's target resolution and re-encoded
+        as a size-capped JPEG off the main thread. Errors are not raised here but stored
+        in the returned future, so a missing cover does not prevent the audio from downloading.
+
+        Returns:
+            concurrent.futures.Future: A future resolving to the JPEG-encoded cover,
+                or raising `requests.exceptions.RequestException` or `CoverNotFound` if the cover could not be downloaded.
         """
-        Downloads and embeds a cover image into the audio file.
+        try:
+            cover_url = request_size(self.__get_cover_url(self.url), self.cover_processor.max_size)
+            response = requests.get(cover_url)
+            response.raise_for_status()
+            return self.cover_processor.submit(response.content)
+        except Exception as e:
+            cover = Future()
+            cover.set_exception(e)
+            return cover
+
+    def embed_cover(self, audio_path, image_path, delete_image, cover=None):
+        """
+        Downloads, normalizes and embeds a cover image into the audio file.
 
         Args:
             audio_path (str): The path to the audio file where the cover will be embedded.
-            image_path (str): The path where the downloaded cover image will be saved temporarily.
+            image_path (str): The path where the processed cover image will be saved temporarily.
             delete_image (bool): Indicates whether the temporary image file should be deleted after embedding.
+            cover (concurrent.futures.Future, optional): A cover already returned by `request_cover()`.
+                If not provided, the cover is requested now.
 
         Raises:
             requests.exceptions.RequestException: If there is a network-related error when making the request.
+            CoverNotFound: If the song page does not contain a cover URL.
+            PIL.UnidentifiedImageError: If the downloaded cover is not a readable image.
         """
+        if cover == None:
+            cover = self.request_cover()
+        cover_data = cover.result()
 
-        # Download the cover
-        response = requests.get(self.__get_cover_url(self.url))
         with open(image_path, "wb") as image:
-            image.write(response.content)
+            image.write(cover_data)
 
         # Embed the cover
-        with open(image_path, "rb") as f:
-            cover_data = f.read()
         audio = MP4(audio_path)
         audio["covr"] = [MP4Cover(cover_data, imageformat=MP4Cover.FORMAT_JPEG)]
         audio.save()
@@ -303,6 +338,9 @@ class YTSong:
         """
         Downloads only the audio file if it does not already exist.
 
+        The audio is written to a temporary `.part` file and only renamed to its final name
+        once the download is complete, so an interrupted download never looks finished.
+
         Raises:
             pytubefix.exceptions.PytubeFixError: If there is an error with the YouTube stream extraction process.
 
@@ -313,7 +351,8 @@ class YTSong:
             print(self.lang_dict["downloading"] % self.full_path)
 
             ys = self.yt.streams.get_audio_only()
-            ys.download(output_path=self.output_dir, filename=self.filename)
+            ys.download(output_path=self.output_dir, filename=self.filename + ".part", skip_existing=False)
+            os.replace(self.full_path + ".part", self.full_path)
         else:
             self.logger.info(f"The download was skipped because a file with the same name already exists: {self.full_path}")
 
@@ -342,12 +381,28 @@ class YTSong:
         Raises:
             requests.exceptions.RequestException: If there is a network-related error when making the request.
             pytubefix.exceptions.PytubeFixError: If there is an error with the YouTube stream extraction process.
+            PIL.UnidentifiedImageError: If the downloaded cover is not a readable image.
         """
-        self.download_only()
-        self.embed_cover(self.full_path, image_path, delete_image)
+        try:
+            # Start processing the cover while the audio downloads
+            cover = self.request_cover()
+            self.download_only()
+            self.embed_cover(self.full_path, image_path, delete_image, cover)
+        finally:
+            if self.owns_cover_processor:
+                self.cover_processor.shutdown()
+
         if self.skip_metadata == False:
             self.embed_metadata(auto_select_mode)
 
 class SongUnavailable(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+class CoverNotFound(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+class NoMetadata(Exception):
     def __init__(self, message):
         super().__init__(message)
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+import json
+import logging
+import http.client
+import pytmdl.journal as journal
+import pytmdl.ytalbum as ytalbum
+
+from types import SimpleNamespace
+from pytmdl.ytsong import YTSong, CoverNotFound
+from pytmdl.ytalbum import YTAlbum
+
+url = "https://music.youtube.com/watch?v=test"
+
+class FakeStream:
+    def __init__(self, failures):
+        self.failures = failures
+
+    def download(self, output_path, filename, skip_existing=True):
+        # pytubefix writes straight to the target file, so a failure leaves part of it behind
+        path = os.path.join(output_path, filename)
+        if self.failures > 0:
+            self.failures -= 1
+            with open(path, "wb") as f:
+                f.write(b"partial")
+            raise http.client.IncompleteRead(b"partial")
+
+        with open(path, "wb") as f:
+            f.write(b"complete")
+        return path
+
+def make_song(output_dir, stream, calls, cover_error=None):
+    song = YTSong.__new__(YTSong)
+    song.url = url
+    song.output_dir = output_dir
+    song.full_track_name = "Artist - Track"
+    song.filename = song.full_track_name + ".m4a"
+    song.full_path = output_dir + "/" + song.filename
+    song.skip_metadata = False
+    song.lang_dict = {"downloading": "Downloading in %s..."}
+    song.logger = logging.getLogger(__name__)
+    song.yt = SimpleNamespace(streams=SimpleNamespace(get_audio_only=lambda: stream))
+    song.request_cover = lambda: None
+
+    def embed_cover(audio_path, image_path, delete_image, cover=None):
+        calls.append(journal.STAGE_COVER)
+        if cover_error != None:
+            raise cover_error
+
+    song.embed_cover = embed_cover
+    song.embed_metadata = lambda auto_select_mode: calls.append(journal.STAGE_METADATA)
+    return song
+
+def make_album(tmp_path, monkeypatch, stream, skip_metadata=True, cover_error=None):
+    calls = []
+
+    album = YTAlbum.__new__(YTAlbum)
+    album.pl = SimpleNamespace(video_urls=[url], title="Album")
+    album.output_dir = str(tmp_path)
+    album.skip_metadata = skip_metadata
+    album.search_max_display = 15
+    album.language = "EN"
+    album.country = "US"
+    album.lang_dict = {"track_skipped": "%s %s", "track_failed": "%s %s"}
+    album.logger = logging.getLogger(__name__)
+
+    def song(url, output_dir, **kwargs):
+        calls.append("song")
+        return make_song(output_dir, stream, calls, cover_error)
+
+    monkeypatch.setattr(ytalbum, "YTSong", song)
+    monkeypatch.setattr(journal.time, "sleep", lambda seconds: None)
+    return album, calls
+
+def read_journal(tmp_path):
+    with open(tmp_path / "Album" / journal.journal_filename, "r") as f:
+        return [json.loads(line) for line in f]
+
+def test_retried_download_replaces_partial_file(tmp_path, monkeypatch):
+    album, calls = make_album(tmp_path, monkeypatch, FakeStream(failures=1))
+    album.download()
+
+    with open(tmp_path / "Album" / "Artist - Track.m4a", "rb") as f:
+        assert f.read() == b"complete"
+    statuses = [(r["stage"], r["status"]) for r in read_journal(tmp_path)]
+    assert (journal.STAGE_DOWNLOAD, journal.STATUS_DONE) in statuses
+    assert (journal.STAGE_COVER, journal.STATUS_DONE) in statuses
+
+def test_failed_download_is_never_journaled_as_done(tmp_path, monkeypatch):
+    # More failures than `retry()` makes attempts
+    album, calls = make_album(tmp_path, monkeypatch, FakeStream(failures=10))
+    album.download()
+
+    assert not os.path.isfile(tmp_path / "Album" / "Artist - Track.m4a")
+    records = read_journal(tmp_path)
+    assert all(r["status"] != journal.STATUS_DONE for r in records)
+    assert records[-1]["status"] == journal.STATUS_FAILED
+    assert not records[-1]["permanent"]
+
+def test_permanent_cover_failure_skips_only_the_cover(tmp_path, monkeypatch):
+    album, calls = make_album(
+        tmp_path,
+        monkeypatch,
+        FakeStream(failures=0),
+        skip_metadata=False,
+        cover_error=CoverNotFound("no og:image")
+        )
+    album.download()
+
+    assert calls == ["song", journal.STAGE_COVER, journal.STAGE_METADATA]
+    failure = read_journal(tmp_path)[-3]
+    assert failure["stage"] == journal.STAGE_COVER
+    assert failure["permanent"]
+
+    # Nothing is left to do, the song is not even fetched again
+    calls.clear()
+    album.download()
+    assert calls == []
+
+def test_unknown_error_is_not_permanent(tmp_path, monkeypatch):
+    album, calls = make_album(tmp_path, monkeypatch, FakeStream(failures=0), cover_error=TypeError("bug"))
+    album.download()
+    assert not read_journal(tmp_path)[-1]["permanent"]
+
+    # Not retried within the run, but tried again by the next one
+    assert calls.count(journal.STAGE_COVER) == 1
+    album.download()
+    assert calls.count(journal.STAGE_COVER) == 2